@@ -1,63 +1,130 @@
 import os
+import hmac
+import asyncio
 import time
-import threading
+import types
 import logging
-from flask import Flask, request, jsonify
-from dotenv import load_dotenv
-from solver import solve_quiz_with_deadline
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
+
+# load local .env only when asked to (local dev); production gets real env vars.
+# Must run before importing solver, since llm_agent reads its key at import.
+if os.getenv("LOAD_DOTENV") == "1":
+    from dotenv import load_dotenv
 
-# load local .env if present (safe for local dev only)
-load_dotenv()
+    load_dotenv(override=False)
+
+from solver import solve_quiz_with_deadline
 
-APP = Flask(__name__)
+APP = FastAPI(default_response_class=ORJSONResponse)
 
 # Logging config
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s: %(message)s")
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 
-QUIZ_SECRET = os.getenv("QUIZ_SECRET", "").strip()
-if not QUIZ_SECRET:
+# All environment lookups happen once here; request handlers only read CONFIG
+CONFIG = types.SimpleNamespace(
+    quiz_secret=os.getenv("QUIZ_SECRET", "").strip(),
+    max_total_seconds=int(os.getenv("QUIZ_TIMEOUT", "170")),
+    port=int(os.getenv("PORT", "3000")),
+    debug=os.getenv("FLASK_ENV") == "development",
+    solve_workers=int(os.getenv("SOLVE_WORKERS", "8")),
+    solve_queue_limit=int(os.getenv("SOLVE_QUEUE_LIMIT", "16")),
+    redis_url=os.getenv("REDIS_URL", "").strip(),
+)
+if not CONFIG.quiz_secret:
     logging.warning("QUIZ_SECRET not set in environment - set it in Render or .env for local dev")
+# encoded once so each request only encodes the submitted value
+_QUIZ_SECRET_BYTES = CONFIG.quiz_secret.encode("utf-8")
+
+# Fixed-size pool for the blocking solver; solves beyond the queue limit are
+# refused with 503 so backpressure reaches the caller instead of piling up threads
+EXECUTOR = ThreadPoolExecutor(max_workers=CONFIG.solve_workers, thread_name_prefix="solver")
+
+# With a broker configured, solves go to Celery workers (see tasks.py) instead
+if CONFIG.redis_url:
+    from kombu.exceptions import OperationalError as BrokerError
+    from tasks import solve_task
+
 
-MAX_TOTAL_SECONDS = int(os.getenv("QUIZ_TIMEOUT", "170"))
+# The real payload is three short strings; bodies above this are refused unread
+MAX_BODY_BYTES = 64 * 1024
 
-@APP.route("/health", methods=["GET"])
-def health():
-    return jsonify({"status": "ok"})
 
-@APP.route("/api/quiz", methods=["POST"])
-def api_quiz():
-    if not request.is_json:
-        return jsonify({"error": "Invalid JSON"}), 400
+# anything longer than these is rejected at validation
+class QuizRequest(BaseModel):
+    email: str = Field(min_length=1, max_length=320)
+    secret: str = Field(min_length=1, max_length=256)
+    url: str = Field(min_length=1, max_length=2048)
 
-    data = request.get_json(silent=True)
-    if data is None:
-        return jsonify({"error": "Invalid JSON"}), 400
 
-    email = data.get("email")
-    secret = data.get("secret")
-    url = data.get("url")
+def _validation_error(exc: ValidationError) -> ORJSONResponse:
+    # keep the 400 contract of the original Flask endpoint instead of FastAPI's 422
+    error_types = {err.get("type") for err in exc.errors()}
+    if "json_invalid" in error_types or "model_type" in error_types:
+        return ORJSONResponse({"error": "Invalid JSON"}, status_code=400)
+    if "string_too_long" in error_types:
+        return ORJSONResponse({"error": "Field too long"}, status_code=400)
+    return ORJSONResponse({"error": "Missing fields: email, secret, url required"}, status_code=400)
 
-    if not email or not secret or not url:
-        return jsonify({"error": "Missing fields: email, secret, url required"}), 400
 
-    if secret != QUIZ_SECRET:
-        return jsonify({"error": "Invalid secret"}), 403
+async def _read_body(request: Request):
+    """Return the request body, or None once it exceeds MAX_BODY_BYTES."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_BODY_BYTES:
+        return None
+    # chunked bodies carry no length header, so also cap while reading
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@APP.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@APP.post("/api/quiz")
+async def api_quiz(request: Request):
+    # pydantic parses the raw bytes straight into the model in one pass,
+    # instead of json.loads into a dict followed by a second validation walk
+    body = await _read_body(request)
+    if body is None:
+        return ORJSONResponse({"error": "Payload too large"}, status_code=413)
+    try:
+        req = QuizRequest.model_validate_json(body)
+    except ValidationError as exc:
+        return _validation_error(exc)
+
+    if not hmac.compare_digest(req.secret.encode("utf-8"), _QUIZ_SECRET_BYTES):
+        return ORJSONResponse({"error": "Invalid secret"}, status_code=403)
 
     # Accept quickly, then solve in background
-    resp = jsonify({"status": "accepted"})
-    resp.status_code = 200
+    args = (req.url, req.email, req.secret, time.time(), CONFIG.max_total_seconds)
+    if CONFIG.redis_url:
+        # publishing is blocking broker I/O (with retries while Redis is
+        # down), so it runs off the event loop
+        try:
+            await asyncio.to_thread(solve_task.apply_async, args=args, expires=CONFIG.max_total_seconds)
+        except BrokerError as e:
+            logging.warning("Could not queue solve: %s", e)
+            return ORJSONResponse({"error": "Solver busy, retry later"}, status_code=503)
+        return {"status": "accepted"}
 
-    start_time = time.time()
-    thread = threading.Thread(
-        target=solve_quiz_with_deadline,
-        args=(url, email, secret, start_time, MAX_TOTAL_SECONDS),
-        daemon=True,
-    )
-    thread.start()
+    if EXECUTOR._work_queue.qsize() >= CONFIG.solve_queue_limit:
+        return ORJSONResponse({"error": "Solver busy, retry later"}, status_code=503)
+    EXECUTOR.submit(solve_quiz_with_deadline, *args)
 
-    return resp
+    return {"status": "accepted"}
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 3000))
-    APP.run(host="0.0.0.0", port=port, debug=(os.getenv("FLASK_ENV") == "development"))
+    import uvicorn
+
+    uvicorn.run(APP, host="0.0.0.0", port=CONFIG.port, log_level="debug" if CONFIG.debug else "info")
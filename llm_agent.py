@@ -1,46 +1,311 @@
 import os
+import re
 import logging
-import json
-import google.generativeai as genai
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Literal, Optional
+
+import httpx
+import msgspec
+import orjson
 
 logger = logging.getLogger("llm_agent")
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# LLM_PROVIDER selects the backend: "gemini" (default) or "openai"
+PROVIDER = os.getenv("LLM_PROVIDER", "gemini").strip().lower()
 
-def ask_llm_for_action(page_text: str, pre_text: str = None):
-    if not GEMINI_API_KEY:
-        logger.error("Gemini API key missing")
-        return None
+# read once at import; never touch os.environ on the request path
+_API_KEY = os.getenv("OPENAI_API_KEY" if PROVIDER == "openai" else "GEMINI_API_KEY", "").strip()
+
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent"
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_MODEL = "gpt-4o-mini"
 
-    prompt = f"""
+# One pooled HTTP/2 client for every LLM call: concurrent solves multiplex
+# over a single kept-alive connection per host, so DNS and TLS setup are
+# paid once per connection instead of once per question
+SESSION = httpx.Client(
+    timeout=20,
+    headers={"Content-Type": "application/json"},
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=16, keepalive_expiry=60),
+    ),
+)
+
+# page_text / pre_text are clipped to this before being placed in the prompt
+MAX_PROMPT_CHARS = 6000
+
+_PROMPT_HEAD = """
 You analyze quiz questions and return ONLY a JSON object describing the next action.
 
 JSON FORMAT:
-{{
-  "action": "sum | max | min | mean | count | chart | return_text | pdf_read",
+{
+  "action": "sum | max | min | mean | median | count | chart | return_text | pdf_read",
   "column": "optional column name",
   "cutoff": number,
   "page": number
-}}
+}
 
 INSTRUCTION:
-{pre_text or ""}
-
-PAGE_TEXT:
-{page_text[:4000]}
 """
 
-    try:
-        model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash",
-            generation_config={"temperature": 0, "response_mime_type": "application/json"}
-        )
+# JSON mode plus a response schema: the model can only emit this object shape,
+# so the reply text is always valid JSON and needs exactly one parse
+_GENERATION_CONFIG = {
+    "temperature": 0,
+    "responseMimeType": "application/json",
+    "responseSchema": {
+        "type": "OBJECT",
+        "properties": {
+            "action": {
+                "type": "STRING",
+                "enum": ["sum", "max", "min", "mean", "median", "count", "chart", "return_text", "pdf_read"],
+            },
+            "column": {"type": "STRING", "nullable": True},
+            "page": {"type": "INTEGER", "nullable": True},
+            "cutoff": {"type": "NUMBER", "nullable": True},
+        },
+        "required": ["action"],
+    },
+}
 
-        response = model.generate_content(prompt)
-        return json.loads(response.text)
+class Action(msgspec.Struct, frozen=True):
+    """Validated LLM decision; mirrors the response schema above."""
 
-    except Exception as e:
-        logger.error(f"LLM error: {e}")
+    action: Literal["sum", "max", "min", "mean", "median", "count", "chart", "return_text", "pdf_read"]
+    column: Optional[str] = None
+    page: Optional[int] = None
+    cutoff: Optional[float] = None
+
+
+# parses and type-checks the reply in a single C pass
+_ACTION_DECODER = msgspec.json.Decoder(Action)
+
+# temperature=0 makes answers deterministic, so identical prompts are served
+# from this LRU instead of another network round trip, backed by an on-disk
+# SQLite table (LLM_CACHE_PATH, empty to disable) that survives restarts
+_CACHE_SIZE = 256
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db").strip()
+_disk = None  # sqlite3 connection, opened on first use; False once disabled
+
+# Answers depend on the provider, model, prompt and schema as much as on the
+# page, so a hash of them prefixes every key: changing any of them starts a
+# fresh cache instead of serving stale actions from disk
+_CACHE_VERSION = hashlib.sha256(
+    orjson.dumps([PROVIDER, GEMINI_URL, OPENAI_MODEL, _PROMPT_HEAD, _GENERATION_CONFIG])
+).hexdigest()[:16]
+
+_WS_RE = re.compile(r"\s+")
+_ACTION_ENCODER = msgspec.json.Encoder()
+
+
+def _normalize(text: str) -> str:
+    # case and whitespace only: digits and URLs carry the cutoffs and pages
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+def _cache_key(page_text: str, pre_text: str) -> str:
+    text = "\0".join((_CACHE_VERSION, _normalize(pre_text), _normalize(page_text)))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _disk_cache():
+    """Return the SQLite connection (call with _cache_lock held), or None."""
+    global _disk
+    if _disk is None:
+        _disk = False
+        if LLM_CACHE_PATH:
+            try:
+                conn = sqlite3.connect(LLM_CACHE_PATH, timeout=2, check_same_thread=False)
+                conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, action BLOB NOT NULL)")
+                conn.commit()
+                _disk = conn
+            except sqlite3.Error as e:
+                logger.warning("LLM disk cache disabled: %s", e)
+    return _disk or None
+
+
+def _cache_get(key: str):
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+            return result
+        db = _disk_cache()
+        if db is None:
+            return None
+        try:
+            row = db.execute("SELECT action FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            result = _ACTION_DECODER.decode(row[0])
+        except (sqlite3.Error, msgspec.DecodeError) as e:
+            logger.warning("LLM disk cache read failed: %s", e)
+            return None
+        _cache[key] = result
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+        return result
+
+
+def _cache_put(key: str, result: Action) -> None:
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+        db = _disk_cache()
+        if db is None:
+            return
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, action) VALUES (?, ?)",
+                (key, _ACTION_ENCODER.encode(result)),
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM disk cache write failed: %s", e)
+
+
+class _JsonObjectBuffer:
+    """Collects streamed text until the first top-level JSON object is closed."""
+
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    self.parts.append(text[: i + 1])
+                    return True
+        self.parts.append(text)
+        return False
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _read_stream(response, extract):
+    """Read an SSE response until the JSON answer is complete; the caller's
+    stream context then closes it without draining the remaining events."""
+    buf = _JsonObjectBuffer()
+    for line in response.iter_lines():
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        delta = extract(orjson.loads(data))
+        if delta and buf.feed(delta):
+            break
+    return _ACTION_DECODER.decode(buf.text())
+
+
+def _gemini_delta(chunk: dict):
+    for candidate in chunk.get("candidates") or ():
+        for part in (candidate.get("content") or {}).get("parts") or ():
+            return part.get("text")
+    return None
+
+
+def _openai_delta(chunk: dict):
+    for choice in chunk.get("choices") or ():
+        return (choice.get("delta") or {}).get("content")
+    return None
+
+
+# Static parts of each request body, serialized once; per call only the prompt
+# string is encoded and spliced in between
+_GEMINI_BODY_HEAD = b'{"contents":[{"parts":[{"text":'
+_GEMINI_BODY_TAIL = b'}]}],"generationConfig":' + orjson.dumps(_GENERATION_CONFIG) + b"}"
+_OPENAI_BODY_HEAD = (
+    orjson.dumps(
+        {
+            "model": OPENAI_MODEL,
+            "temperature": 0,
+            "stream": True,
+            "response_format": {"type": "json_object"},
+        }
+    )[:-1]
+    + b',"messages":[{"role":"user","content":'
+)
+_OPENAI_BODY_TAIL = b"}]}"
+
+
+def _call_gemini(prompt: str):
+    body = b"".join((_GEMINI_BODY_HEAD, orjson.dumps(prompt), _GEMINI_BODY_TAIL))
+    with SESSION.stream("POST", GEMINI_URL, params={"key": _API_KEY, "alt": "sse"}, content=body) as response:
+        response.raise_for_status()
+        return _read_stream(response, _gemini_delta)
+
+
+def _call_openai(prompt: str):
+    body = b"".join((_OPENAI_BODY_HEAD, orjson.dumps(prompt), _OPENAI_BODY_TAIL))
+    headers = {"Authorization": f"Bearer {_API_KEY}"}
+    with SESSION.stream("POST", OPENAI_URL, headers=headers, content=body) as response:
+        response.raise_for_status()
+        return _read_stream(response, _openai_delta)
+
+
+_CALLERS = {"gemini": _call_gemini, "openai": _call_openai}
+
+
+def ask_llm_for_action(page_text: str, pre_text: str = None):
+    call = _CALLERS.get(PROVIDER)
+    if call is None:
+        logger.error("Unknown LLM provider: %s", PROVIDER)
+        return None
+    if not _API_KEY:
+        logger.error("%s API key missing", PROVIDER)
         return None
+
+    # slicing a str that is already short enough returns it without copying
+    page_text = (page_text or "")[:MAX_PROMPT_CHARS]
+    pre_text = (pre_text or "")[:MAX_PROMPT_CHARS]
+
+    key = _cache_key(page_text, pre_text)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("page_text head=%r", page_text[:200])
+    prompt = "".join((_PROMPT_HEAD, pre_text, "\n\nPAGE_TEXT:\n", page_text, "\n"))
+
+    try:
+        result = call(prompt)
+        _cache_put(key, result)
+        logger.info("LLM decision %s", result)
+        return result
+
+    except httpx.TimeoutException:
+        logger.warning("%s timeout", PROVIDER)
+    except httpx.HTTPStatusError as e:
+        logger.warning("%s http %s", PROVIDER, e.response.status_code)
+    except (KeyError, IndexError, TypeError, ValueError, orjson.JSONDecodeError, msgspec.DecodeError):
+        logger.warning("%s bad payload", PROVIDER)
+    except Exception as e:
+        logger.exception("LLM error: %s", e)
+    return None
@@ -1,19 +1,29 @@
-# solver.py  (synchronous, Gemini-only)
+# solver.py  (asyncio + aiohttp)
+import asyncio
+import atexit
+import threading
 import time
+import types
 import logging
 import re
 import json
 import base64
 import os
+import tempfile
+import importlib.util
+from collections import OrderedDict
 from typing import Optional
 from io import BytesIO
 from urllib.parse import urljoin
 
-import requests
+import aiohttp
 import pandas as pd
 from bs4 import BeautifulSoup
 
 from utils import (
+    QUESTION_PATTERNS,
+    PageScanner,
+    may_match,
     parse_question_text,
     compute_answer_from_csv_bytes,
     compute_answer_from_excel_bytes,
@@ -27,6 +37,73 @@ from llm_agent import ask_llm_for_action
 logger = logging.getLogger("solver")
 logging.basicConfig(level=logging.INFO)
 
+# default per-request timeout; page loads and downloads pass their own
+_HTTP_TIMEOUT = aiohttp.ClientTimeout(total=25)
+
+# Page loads only consume markup: ask for it, and never read bodies of these
+# types (the quiz page and scrape targets are never images, media, fonts or CSS)
+_PAGE_HEADERS = {"Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5"}
+_SKIPPED_CONTENT_TYPES = ("image/", "audio/", "video/", "font/", "text/css")
+
+# downloads answered by computing over their contents (anything else,
+# e.g. an audio clip, is only ever embedded or transcribed)
+_DATA_FILE_EXTS = ("csv", "pdf", "xlsx", "xls", "json")
+
+# pages with no more text than this are answered as text without asking the LLM
+_LLM_MIN_PAGE_CHARS = 400
+
+# upper bound for one page load; also clipped to the time left on the deadline
+_PAGE_TIMEOUT = 20
+
+# Page and file GETs are idempotent, so transient failures are retried with
+# exponential backoff (0.5s, 1s) as long as the call's time budget allows
+_RETRY_ATTEMPTS = 3
+_RETRY_BASE_DELAY = 0.5
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Downloaded files by URL, kept only when the server sent a validator. Later
+# fetches of the same URL send If-None-Match / If-Modified-Since, and a 304
+# reuses the stored body instead of downloading it again.
+_FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_file_cache = OrderedDict()  # url -> (etag, last_modified, body)
+_file_cache_bytes = 0
+_file_cache_lock = threading.Lock()
+
+# audio questions go to the OpenAI transcription API when a key is configured;
+# a locally installed openai-whisper is the fallback, imported and loaded
+# (seconds, and hundreds of MB) only the first time it is actually needed
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
+OPENAI_TRANSCRIBE_URL = "https://api.openai.com/v1/audio/transcriptions"
+WHISPER_AVAILABLE = importlib.util.find_spec("whisper") is not None
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL", "small").strip()
+_WHISPER_MODEL = None
+_whisper_lock = threading.Lock()
+
+# ----------------- patterns (compiled once at import) -----------------
+
+_ATOB_RE = re.compile(r"atob\(`([^`]+)`\)")
+_SUBMIT_RE1 = re.compile(r"https?://[^\s'\"<>]+/submit[^\s'\"<>]*", re.I)
+_SUBMIT_RE2 = re.compile(r"https?://[^\s'\"<>]+/(submit|post|answer)[^\s'\"<>]*", re.I)
+_SUBMIT_REL_RE = re.compile(r"(^|[^A-Za-z])(\/submit[^\s'\"<>]*)", re.I)
+_POST_BACK_RE = re.compile(r"post\s+back\s+to\s+(\/submit[^\s'\"<>]*)", re.I)
+_FILE_RE = re.compile(r"https?://[^\s'\"<>]+\.(csv|pdf|xlsx|xls|json|wav|mp3)", re.I)
+_SCRAPE_RE = re.compile(r"scrape\s+([\/][^\s'\"<>]+)", re.I)
+_SECRET_CODE_RE = re.compile(r"secret\s*code\s*[:\-]?\s*([A-Za-z0-9_-]+)", re.I)
+_AUDIO_RE = re.compile(r"https?://[^\s'\"<>]+\.(mp3|wav|m4a|ogg)", re.I)
+
+# one pass over pre_text + page_text tells every detector and the question
+# heuristics which patterns can possibly match (see utils.PageScanner)
+_PAGE_SCANNER = PageScanner({
+    "submit": _SUBMIT_RE1,
+    "submit_any": _SUBMIT_RE2,
+    "submit_rel": _SUBMIT_REL_RE,
+    "post_back": _POST_BACK_RE,
+    "file": _FILE_RE,
+    "scrape": _SCRAPE_RE,
+    "audio": _AUDIO_RE,
+    **QUESTION_PATTERNS,
+})
+
 
 # ----------------- entrypoint -----------------
 
@@ -37,15 +114,118 @@ def solve_quiz_with_deadline(url: str, email: str, secret: str,
     if remaining <= 3:
         logger.warning("Not enough time left to start solver.")
         return
+    state = _worker_state()
     try:
-        _solve_quiz_chain(url, email, secret, deadline)
-    except Exception as e:
+        state.loop.run_until_complete(_solve_with_session(url, email, secret, deadline))
+    except BaseException as e:
+        # An exception raised from outside the coroutine (e.g. Celery's soft
+        # time limit, delivered by a signal while the loop waits in select)
+        # leaves the solve's tasks pending on this loop; they must not resume
+        # during the next solve on this worker
+        _reset_worker_loop(state)
+        if not isinstance(e, Exception):
+            raise
         logger.exception("Solver error: %s", e)
 
 
+# ----------------- per-worker HTTP session -----------------
+# Each solver thread keeps one event loop and one aiohttp session for its
+# whole life, so later solves skip loop/connector setup and reuse warm
+# keep-alive connections. Cookies are not kept, so solves stay isolated.
+# A session idle for longer than _SESSION_MAX_IDLE, or one whose solve
+# failed, is closed and replaced before the next solve uses it.
+
+_SESSION_MAX_IDLE = 60
+
+_local = threading.local()
+_worker_states = []
+_worker_states_lock = threading.Lock()
+
+
+def _worker_state() -> types.SimpleNamespace:
+    state = getattr(_local, "state", None)
+    if state is None:
+        state = types.SimpleNamespace(loop=asyncio.new_event_loop(), session=None, last_used=0.0)
+        _local.state = state
+        with _worker_states_lock:
+            _worker_states.append(state)
+    return state
+
+
+def _new_session() -> aiohttp.ClientSession:
+    # Capped connections: the file, scrape and audio fetches of one step run
+    # concurrently, and at most 4 of them may hit the same host at once
+    connector = aiohttp.TCPConnector(limit=8, limit_per_host=4, ttl_dns_cache=300, keepalive_timeout=30)
+    return aiohttp.ClientSession(connector=connector, timeout=_HTTP_TIMEOUT, cookie_jar=aiohttp.DummyCookieJar())
+
+
+async def _discard_session(state: types.SimpleNamespace) -> None:
+    session, state.session = state.session, None
+    if session is not None and not session.closed:
+        try:
+            await session.close()
+        except Exception:
+            pass
+
+
+async def _solve_with_session(url: str, email: str, secret: str, deadline: float) -> None:
+    state = _worker_state()
+    if state.session is not None and (
+        state.session.closed or time.monotonic() - state.last_used > _SESSION_MAX_IDLE
+    ):
+        # its kept-alive connections have expired by now anyway
+        await _discard_session(state)
+    if state.session is None:
+        state.session = _new_session()
+    try:
+        await _solve_quiz_chain(state.session, url, email, secret, deadline)
+    except BaseException:
+        # don't hand a connector in an unknown state to the next solve
+        await _discard_session(state)
+        raise
+    finally:
+        state.last_used = time.monotonic()
+
+
+def _reset_worker_loop(state: types.SimpleNamespace) -> None:
+    """Cancel and drain every task left on the worker loop, then drop its session."""
+    loop = state.loop
+    try:
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(_discard_session(state))
+    except BaseException as e:
+        # could not clean up in place: give this worker a fresh loop instead
+        logger.warning("Replacing worker event loop: %s", e)
+        state.session = None
+        try:
+            loop.close()
+        except Exception:
+            pass
+        state.loop = asyncio.new_event_loop()
+
+
+@atexit.register
+def _close_worker_sessions() -> None:
+    # worker threads have been joined by now, so no loop is running
+    with _worker_states_lock:
+        states = list(_worker_states)
+    for state in states:
+        try:
+            if state.session is not None and not state.session.closed:
+                state.loop.run_until_complete(state.session.close())
+            state.loop.close()
+        except Exception:
+            pass
+
+
 # ----------------- main loop -----------------
 
-def _solve_quiz_chain(initial_url: str, email: str, secret: str, deadline: float) -> None:
+async def _solve_quiz_chain(http: aiohttp.ClientSession, initial_url: str, email: str,
+                            secret: str, deadline: float) -> None:
     def time_left() -> int:
         return max(0, int(deadline - time.time()))
 
@@ -61,25 +241,29 @@ def _solve_quiz_chain(initial_url: str, email: str, secret: str, deadline: float
 
         logger.info("Loading %s (time left %d)", current_url, time_left())
         try:
-            resp = requests.get(current_url, timeout=40)
-            resp.raise_for_status()
+            html = await fetch_page_html(http, current_url, min(_PAGE_TIMEOUT, time_left()))
         except Exception as e:
             logger.error("Page load failed: %s", e)
             break
 
-        html = resp.text or ""
         soup = BeautifulSoup(html, "lxml")
 
         # Visible text and candidate instruction blocks
         visible_text = soup.get_text(separator="\n")
-        pre_blocks = [tag.get_text("\n") for tag in soup.find_all("pre")]
+        # <pre> and <script> blocks are collected in one walk of the tree
+        pre_blocks = []
+        script_texts = []
+        for tag in soup.find_all(("pre", "script")):
+            if tag.name == "pre":
+                pre_blocks.append(tag.get_text("\n"))
+            else:
+                script_texts.append(tag.get_text())
         pre_text = "\n\n".join(pre_blocks)
-        script_texts = [tag.get_text() for tag in soup.find_all("script")]
         script_text = "\n\n".join(script_texts)
 
         # decode atob(`...`) base64-in-script if present
         decoded_chunks = []
-        for m in re.finditer(r"atob\(`([^`]+)`\)", script_text):
+        for m in _ATOB_RE.finditer(script_text):
             b64 = m.group(1).replace("\n", "")
             try:
                 decoded = base64.b64decode(b64).decode("utf-8", errors="ignore")
@@ -91,61 +275,91 @@ def _solve_quiz_chain(initial_url: str, email: str, secret: str, deadline: float
             pre_text = (pre_text + "\n\n" + decoded_text).strip()
 
         page_text = visible_text
-        logger.info("Page snippet: %s", (page_text[:300].replace("\n", " ") if page_text else ""))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Page snippet: %s", page_text[:300].replace("\n", " "))
+
+        hits = _PAGE_SCANNER.scan(pre_text + "\n" + page_text)
 
         # 1) detect submit URL
-        submit_url = detect_submit_url(page_text, pre_text, current_url)
+        submit_url = detect_submit_url(page_text, pre_text, current_url, hits)
         if not submit_url:
             logger.error("Submit URL not found. Stopping.")
             break
         logger.info("Submit URL: %s", submit_url)
 
-        # 2) detect data file (csv/pdf/xlsx/json)
-        file_url = detect_file_url(page_text, pre_text)
-        file_bytes = None
-        file_ext = None
-        if file_url:
-            try:
-                r = requests.get(file_url, timeout=30)
-                if r.ok:
-                    file_bytes = r.content
-                    file_ext = file_url.rsplit(".", 1)[-1].lower()
-                    logger.info("Downloaded file: %s (%d bytes)", file_ext, len(file_bytes))
-            except Exception as e:
-                logger.error("File download error: %s", e)
-
-        # 3) detect scrape instruction (secondary page)
-        scrape_url = detect_scrape_url(page_text, current_url)
-        secret_code = None
+        # 2) detect data file (csv/pdf/xlsx/json), 3) scrape instruction
+        # (secondary page) and 4) audio URL; the fetches are independent, so
+        # they run concurrently and the page waits for the slowest, not the sum
+        file_url = detect_file_url(page_text, pre_text, hits)
+        scrape_url = detect_scrape_url(page_text, current_url, hits)
+        audio_url = detect_audio_url(page_text, pre_text, hits)
         if scrape_url:
             logger.info("Found scrape instruction -> visiting %s", scrape_url)
-            secret_code = scrape_secondary_page(scrape_url)
-
-        # 4) detect audio URL - (we are not transcribing audio; skip)
-        audio_url = detect_audio_url(page_text, pre_text)
-        audio_transcript = None
 
-        # 5) decide action (heuristics + optional LLM)
-        question_spec = parse_question_text(page_text, pre_text)
-        # if parse didn't fully decide, ask Gemini LLM for structured action
-        if question_spec.get("action") in (None, "return_text"):
+        file_task = asyncio.create_task(fetch_file(http, file_url)) if file_url else None
+        results = await asyncio.gather(
+            file_task or _nothing(),
+            scrape_secondary_page(http, scrape_url, min(_PAGE_TIMEOUT, time_left()))
+            if scrape_url else _nothing(),
+            # an audio link is usually the data file too: reuse that download
+            fetch_and_transcribe(http, audio_url, file_task if audio_url == file_url else None)
+            if audio_url else _nothing(),
+            return_exceptions=True,
+        )
+        file_bytes, secret_code, audio_transcript = (
+            None if isinstance(r, BaseException) else r for r in results
+        )
+        file_ext = None
+        if file_bytes is not None:
+            file_ext = file_url.rsplit(".", 1)[-1].lower()
+            logger.info("Downloaded file: %s (%d bytes)", file_ext, len(file_bytes))
+
+        # an audio clip next to a data file carries the instructions for that
+        # file, so its transcript is read as instructions rather than submitted
+        has_data_file = file_ext in _DATA_FILE_EXTS
+        instructions, spec_hits = pre_text, hits
+        if audio_transcript and has_data_file:
+            instructions = (audio_transcript.strip() + "\n\n" + pre_text).strip()
+            spec_hits = None  # hits were scanned before the transcript existed
+
+        # 5) decide action: heuristics on the short <pre> block first, then on
+        # the whole page; the LLM only for pages with enough text to be a question
+        question_spec = {"action": None, "column": None, "cutoff": None, "page": None}
+        if instructions:
+            question_spec = parse_question_text("", instructions, spec_hits, default=None)
+        if question_spec["action"] is None:
+            # the instructions were read above; only the rest of the page is new.
+            # Carry over what a combined parse would have kept from them: it
+            # returns on count/aggregates before reading a cutoff, and on chart
+            # before reading a page number
+            page_spec = parse_question_text(page_text, None, spec_hits, default=None)
+            carried = {None: ("cutoff", "page"), "chart": ("cutoff",)}.get(page_spec["action"], ())
+            for k in carried:
+                if question_spec[k] is not None:
+                    page_spec[k] = question_spec[k]
+            question_spec = page_spec
+        if question_spec["action"] is None and len(page_text or "") > _LLM_MIN_PAGE_CHARS:
             llm_spec = None
             try:
-                llm_spec = ask_llm_for_action(page_text, pre_text)
+                llm_spec = ask_llm_for_action(page_text, instructions)
             except Exception:
                 llm_spec = None
-            if llm_spec:
-                # safe merge: only allow known fields
-                for k in ("action", "column", "page", "cutoff"):
-                    if k in llm_spec:
-                        question_spec[k] = llm_spec[k]
+            if llm_spec is not None:
+                # fields were validated by the Action decoder; only take set values
+                question_spec["action"] = llm_spec.action
+                for k in ("column", "page", "cutoff"):
+                    v = getattr(llm_spec, k)
+                    if v is not None:
+                        question_spec[k] = v
+        if question_spec["action"] is None:
+            question_spec["action"] = "return_text"
 
         # 6) compute answer
         answer = None
         try:
             if secret_code:
                 answer = secret_code
-            elif audio_transcript:
+            elif audio_transcript and not has_data_file:
                 answer = audio_transcript.strip()
             elif file_bytes and file_ext:
                 if file_ext == "csv":
@@ -186,17 +400,18 @@ def _solve_quiz_chain(initial_url: str, email: str, secret: str, deadline: float
 
         next_url = None
         try:
-            resp = requests.post(submit_url, json=payload, timeout=25)
-            logger.info("Submit HTTP %s", resp.status_code)
-            logger.info("Submit text: %s", resp.text[:1000])
-            if resp.ok:
-                try:
-                    jr = resp.json()
-                    next_url = jr.get("url")
-                except Exception:
-                    pass
-            else:
-                logger.warning("Submit returned non-200.")
+            async with http.post(submit_url, json=payload) as resp:
+                body = await resp.text(errors="replace")
+                logger.info("Submit HTTP %s", resp.status)
+                logger.info("Submit text: %s", body[:1000])
+                if resp.ok:
+                    try:
+                        jr = json.loads(body)
+                        next_url = jr.get("url")
+                    except Exception:
+                        pass
+                else:
+                    logger.warning("Submit returned non-200.")
         except Exception as e:
             logger.error("Submit error: %s", e)
             break
@@ -213,65 +428,251 @@ def _solve_quiz_chain(initial_url: str, email: str, secret: str, deadline: float
 
 # ----------------- helpers -----------------
 
-def detect_submit_url(page_text: str, pre_text: str, current_url: str) -> Optional[str]:
+def detect_submit_url(page_text: str, pre_text: str, current_url: str, hits=None) -> Optional[str]:
     content = (pre_text or "") + "\n" + (page_text or "")
-    m = re.search(r"https?://[^\s'\"<>]+/submit[^\s'\"<>]*", content, flags=re.I)
+    m = _SUBMIT_RE1.search(content) if may_match(hits, "submit") else None
     if m:
         return m.group(0)
-    m = re.search(r"https?://[^\s'\"<>]+/(submit|post|answer)[^\s'\"<>]*", content, flags=re.I)
+    m = _SUBMIT_RE2.search(content) if may_match(hits, "submit_any") else None
     if m:
         return m.group(0)
     # relative /submit
-    m = re.search(r"(^|[^A-Za-z])(\/submit[^\s'\"<>]*)", content, flags=re.I)
+    m = _SUBMIT_REL_RE.search(content) if may_match(hits, "submit_rel") else None
     if m:
         return urljoin(current_url, m.group(2))
-    m = re.search(r"post\s+back\s+to\s+(\/submit[^\s'\"<>]*)", content, flags=re.I)
+    m = _POST_BACK_RE.search(content) if may_match(hits, "post_back") else None
     if m:
         return urljoin(current_url, m.group(1))
     return None
 
 
-def detect_file_url(page_text: str, pre_text: str) -> Optional[str]:
+def detect_file_url(page_text: str, pre_text: str, hits=None) -> Optional[str]:
+    if not may_match(hits, "file"):
+        return None
     content = (pre_text or "") + "\n" + (page_text or "")
-    m = re.search(r"https?://[^\s'\"<>]+\.(csv|pdf|xlsx|xls|json|wav|mp3)", content, flags=re.I)
+    m = _FILE_RE.search(content)
     return m.group(0) if m else None
 
 
-def detect_scrape_url(page_text: str, current_url: str) -> Optional[str]:
-    m = re.search(r"scrape\s+([\/][^\s'\"<>]+)", page_text, flags=re.I)
+def detect_scrape_url(page_text: str, current_url: str, hits=None) -> Optional[str]:
+    if not may_match(hits, "scrape"):
+        return None
+    m = _SCRAPE_RE.search(page_text)
     if m:
         return urljoin(current_url, m.group(1))
     return None
 
 
-def scrape_secondary_page(scrape_url: str) -> Optional[str]:
+async def _nothing() -> None:
+    return None
+
+
+class _TransientStatus(Exception):
+    """Raised for response statuses worth retrying."""
+
+
+def _raise_if_transient(resp: aiohttp.ClientResponse) -> None:
+    if resp.status in _RETRY_STATUSES:
+        raise _TransientStatus(f"HTTP {resp.status}")
+
+
+async def _with_retries(attempt, budget: float, url: str):
+    """Await attempt(timeout), retrying transient failures within budget seconds."""
+    give_up = time.monotonic() + budget
+    for i in range(_RETRY_ATTEMPTS):
+        timeout = aiohttp.ClientTimeout(total=max(0.1, give_up - time.monotonic()))
+        try:
+            return await attempt(timeout)
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                asyncio.TimeoutError, _TransientStatus) as e:
+            delay = _RETRY_BASE_DELAY * 2 ** i
+            # leave at least a second for the next attempt itself
+            if i + 1 == _RETRY_ATTEMPTS or give_up - time.monotonic() < delay + 1:
+                raise
+            logger.warning("Retrying %s in %.1fs: %s", url, delay, e)
+            await asyncio.sleep(delay)
+
+
+async def fetch_page_html(http: aiohttp.ClientSession, url: str, timeout: float) -> str:
+    async def attempt(client_timeout):
+        async with http.get(url, headers=_PAGE_HEADERS, timeout=client_timeout) as resp:
+            _raise_if_transient(resp)
+            resp.raise_for_status()
+            if resp.content_type.startswith(_SKIPPED_CONTENT_TYPES):
+                # hang up without downloading a body we would only parse as garbage
+                raise ValueError(f"not a page ({resp.content_type}): {url}")
+            return await resp.text(errors="replace")
+
+    return await _with_retries(attempt, timeout, url)
+
+
+def _file_cache_get(url: str):
+    with _file_cache_lock:
+        entry = _file_cache.get(url)
+        if entry is not None:
+            _file_cache.move_to_end(url)
+        return entry
+
+
+def _file_cache_put(url: str, etag: Optional[str], last_modified: Optional[str], body: bytes) -> None:
+    global _file_cache_bytes
+    if not (etag or last_modified) or len(body) > _FILE_CACHE_MAX_BYTES:
+        return
+    with _file_cache_lock:
+        old = _file_cache.pop(url, None)
+        if old is not None:
+            _file_cache_bytes -= len(old[2])
+        _file_cache[url] = (etag, last_modified, body)
+        _file_cache_bytes += len(body)
+        while _file_cache_bytes > _FILE_CACHE_MAX_BYTES:
+            _, (_, _, evicted) = _file_cache.popitem(last=False)
+            _file_cache_bytes -= len(evicted)
+
+
+async def fetch_file(http: aiohttp.ClientSession, file_url: str) -> Optional[bytes]:
+    cached = _file_cache_get(file_url)
+    headers = {}
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    async def attempt(client_timeout):
+        async with http.get(file_url, headers=headers, timeout=client_timeout) as r:
+            if r.status == 304 and cached is not None:
+                logger.info("File not modified, reusing cached copy: %s", file_url)
+                return cached[2]
+            _raise_if_transient(r)
+            if r.ok:
+                body = await r.read()
+                _file_cache_put(file_url, r.headers.get("ETag"), r.headers.get("Last-Modified"), body)
+                return body
+        return None
+
+    try:
+        return await _with_retries(attempt, 30, file_url)
+    except Exception as e:
+        logger.error("File download error: %s", e)
+    return None
+
+
+async def scrape_secondary_page(http: aiohttp.ClientSession, scrape_url: str,
+                                timeout: float = _PAGE_TIMEOUT) -> Optional[str]:
     try:
-        resp = requests.get(scrape_url, timeout=30)
-        resp.raise_for_status()
-        html = resp.text or ""
+        html = await fetch_page_html(http, scrape_url, timeout)
         soup = BeautifulSoup(html, "lxml")
         text = soup.get_text(separator="\n")
     except Exception as e:
         logger.error("Secondary scrape failed: %s", e)
         return None
 
-    m = re.search(r"secret\s*code\s*[:\-]?\s*([A-Za-z0-9_-]+)", text, flags=re.I)
+    m = _SECRET_CODE_RE.search(text)
     if m:
         return m.group(1)
     return text.strip()[:300]
 
 
-def detect_audio_url(page_text: str, pre_text: str) -> Optional[str]:
+def detect_audio_url(page_text: str, pre_text: str, hits=None) -> Optional[str]:
+    if not may_match(hits, "audio"):
+        return None
     content = (pre_text or "") + "\n" + (page_text or "")
-    m = re.search(r"https?://[^\s'\"<>]+\.(mp3|wav|m4a|ogg)", content, flags=re.I)
+    m = _AUDIO_RE.search(content)
     return m.group(0) if m else None
 
 
-def enforce_payload_limit(payload: dict) -> dict:
+async def fetch_and_transcribe(http: aiohttp.ClientSession, audio_url: str,
+                               download: Optional[asyncio.Task] = None) -> Optional[str]:
+    if not (OPENAI_API_KEY or WHISPER_AVAILABLE):
+        return None
+    audio_bytes = await download if download is not None else await fetch_file(http, audio_url)
+    if not audio_bytes:
+        return None
+    return await transcribe_audio(http, audio_bytes, audio_url.rsplit("/", 1)[-1])
+
+
+async def transcribe_audio(http: aiohttp.ClientSession, audio_bytes: bytes, filename: str) -> Optional[str]:
+    text = await _transcribe_openai(http, audio_bytes, filename) if OPENAI_API_KEY else None
+    if text is None and WHISPER_AVAILABLE:
+        # model inference is CPU-bound; keep the event loop free meanwhile
+        text = await asyncio.to_thread(_transcribe_whisper, audio_bytes, filename)
+    return text
+
+
+async def _transcribe_openai(http: aiohttp.ClientSession, audio_bytes: bytes, filename: str) -> Optional[str]:
+    # bytes go straight into the multipart body, no temp file
+    form = aiohttp.FormData()
+    form.add_field("model", "whisper-1")
+    form.add_field("file", audio_bytes, filename=filename)
     try:
-        b = json.dumps(payload).encode("utf-8")
-        if len(b) > 900_000 and isinstance(payload.get("answer"), str):
-            payload["answer"] = payload["answer"][:200000]
-    except Exception:
-        pass
+        async with http.post(
+            OPENAI_TRANSCRIBE_URL,
+            data=form,
+            headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+            timeout=aiohttp.ClientTimeout(total=60),
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        return (data.get("text") or "").strip() or None
+    except Exception as e:
+        logger.error("Audio transcription failed: %s", e)
+        return None
+
+
+def _get_whisper():
+    global _WHISPER_MODEL
+    with _whisper_lock:
+        if _WHISPER_MODEL is None:
+            import whisper
+
+            logger.info("Loading whisper model %s", WHISPER_MODEL_NAME)
+            _WHISPER_MODEL = whisper.load_model(WHISPER_MODEL_NAME)
+        return _WHISPER_MODEL
+
+
+def _transcribe_whisper(audio_bytes: bytes, filename: str) -> Optional[str]:
+    # whisper decodes through ffmpeg, which needs a path, so only this path
+    # writes the audio to disk
+    suffix = os.path.splitext(filename)[1] or ".mp3"
+    path = None
+    try:
+        model = _get_whisper()
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            tmp.write(audio_bytes)
+            path = tmp.name
+        # fp16=False: on CPU half precision is unsupported and only adds a warning
+        result = model.transcribe(path, fp16=False)
+        return (result.get("text") or "").strip() or None
+    except Exception as e:
+        logger.error("Local whisper transcription failed: %s", e)
+        return None
+    finally:
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_PAYLOAD_LIMIT = 900_000
+
+
+def enforce_payload_limit(payload: dict) -> dict:
+    # The answer dominates the payload (a data URI can be megabytes), so its
+    # length plus a constant for the other fields is a good size estimate;
+    # the payload is only serialized when that estimate is within 10% of the limit
+    answer = payload.get("answer")
+    if not isinstance(answer, str):
+        return payload
+    estimate = len(answer) + 2000
+    if estimate < _PAYLOAD_LIMIT * 0.9:
+        return payload
+    if estimate <= _PAYLOAD_LIMIT * 1.1:
+        try:
+            if len(json.dumps(payload).encode("utf-8")) <= _PAYLOAD_LIMIT:
+                return payload
+        except Exception:
+            return payload
+    payload["answer"] = answer[:200000]
     return payload
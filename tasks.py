@@ -0,0 +1,22 @@
+import os
+import logging
+from celery import Celery
+
+# same opt-in .env handling as app.py, for workers started on their own
+if os.getenv("LOAD_DOTENV") == "1":
+    from dotenv import load_dotenv
+
+    load_dotenv(override=False)
+
+from solver import solve_quiz_with_deadline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s: %(message)s")
+
+MAX_TOTAL_SECONDS = int(os.getenv("QUIZ_TIMEOUT", "170"))
+
+celery = Celery("quiz", broker=os.getenv("REDIS_URL"))
+
+
+@celery.task(soft_time_limit=MAX_TOTAL_SECONDS, acks_late=True)
+def solve_task(url: str, email: str, secret: str, start_time: float, max_seconds: int) -> None:
+    solve_quiz_with_deadline(url, email, secret, start_time, max_seconds)
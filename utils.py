@@ -4,34 +4,202 @@ import json
 from io import BytesIO
 import base64
 import logging
+import unicodedata
+from typing import Optional
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import pdfplumber
+from PIL import Image, ImageDraw
+
+try:
+    import hyperscan  # optional: single-pass multi-pattern prefilter
+except ImportError:
+    hyperscan = None
+
+try:
+    import pyarrow as pa  # optional: multi-threaded CSV parsing for numeric answers
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+try:
+    import pybase64  # optional: SIMD base64, encodes straight to str
+except ImportError:
+    pybase64 = None
+
+try:
+    import pymupdf  # optional: PyMuPDF, much faster plain-text extraction than pdfplumber
+except ImportError:
+    pymupdf = None
+
+try:
+    from numba import njit, prange  # optional: parallel kernel for very large numeric columns
+except ImportError:
+    njit = None
 
 logger = logging.getLogger("utils")
 logging.basicConfig(level=logging.INFO)
 
+# question heuristics run on lower-cased text, so no re.I needed
+_COUNT_RE = re.compile(r"\b(count|how many)\b.*\b(rows|entries|lines)\b")
+_AGG_RE = re.compile(r"(sum|total|mean|average|max|min|median)\s+of\s+([A-Za-z0-9_ \-]+)")
+_CUTOFF_RE = re.compile(r"(?:greater than|>|\bmore than\b)\s*([0-9,\.]+)")
+_CHART_RE = re.compile(r"\b(chart|plot|graph)\b")
+_PAGE_RE = re.compile(r"page\s+(\d+)")
+_NUM_RE = re.compile(r"[-+]?\d{1,3}(?:[,]\d{3})*(?:\.\d+)?|\d+\.\d+")
+
+QUESTION_PATTERNS = {
+    "count": _COUNT_RE,
+    "agg": _AGG_RE,
+    "cutoff": _CUTOFF_RE,
+    "chart": _CHART_RE,
+    "page": _PAGE_RE,
+}
+
+
+# ---------------- single-pass page scan ----------------
+
+def _build_scan_fold_table() -> dict:
+    """
+    str.translate table for text handed to hyperscan. Without UCP, its \\s,
+    \\d and case folding are ASCII-only, while re on str is Unicode-aware, so
+    characters re treats like ASCII are mapped to that ASCII form: whitespace
+    (e.g. the \\xa0 BeautifulSoup makes of &nbsp;) to a space, decimal digits
+    to 0-9, and letters that case-fold to ASCII (Kelvin sign, long s, ...) to it.
+    Newlines are kept, since "." must still stop at them.
+    """
+    table = {}
+    # every such character lies in planes 0-1; the full range is much slower to walk
+    for cp in range(0x20000):
+        ch = chr(cp)
+        if cp < 0x80:
+            if ch.isspace() and ch not in "\n ":
+                table[cp] = " "
+            continue
+        if ch.isspace():
+            table[cp] = " "
+        elif ch.isdecimal():
+            table[cp] = str(unicodedata.decimal(ch))
+        else:
+            lower = ch.lower()
+            if lower != ch and any(c < "\x80" for c in lower):
+                table[cp] = lower
+            else:
+                upper = ch.upper()
+                if len(upper) == 1 and upper < "\x80":
+                    table[cp] = upper
+    return table
+
+
+# Texts whose re matches must all be reported by a compiled scanner; if one
+# is missed, the scanner is disabled rather than let it skip real matches
+_SCAN_PROBES = (
+    "What is the sum\xa0of price?",
+    "How many\u2009rows are there",
+    "count\xa0the\xa0rows",
+    "values greater than\xa0100",
+    "see page\u00a0\u0663 of the PDF",
+    "Post\xa0back to /submit?id=1",
+    "Scrape\u3000/data?email=x and plot a chart",
+)
+
+
+class PageScanner:
+    """
+    Reports which of a set of named patterns occur anywhere in a text.
+    With hyperscan installed, all patterns are matched in one pass over the
+    text (case-insensitively and after folding Unicode whitespace, digits and
+    letters to ASCII, so the result is a superset of what the re patterns
+    match); callers then run the exact re pattern only for names in the
+    result. Without hyperscan, scan() returns None, meaning "unknown".
+    """
+
+    def __init__(self, patterns: dict):
+        self.names = list(patterns)
+        self.db = None
+        if hyperscan is None:
+            return
+        self.fold = _build_scan_fold_table()
+        # no HS_FLAG_UCP: hyperscan rejects \b in UCP mode
+        flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[rx.pattern.encode("utf-8") for rx in patterns.values()],
+                ids=list(range(len(self.names))),
+                elements=len(self.names),
+                flags=[flags] * len(self.names),
+            )
+            self.db = db
+        except Exception as e:
+            logger.warning("hyperscan compile failed, using re only: %s", e)
+            return
+        missed = self._self_check(patterns)
+        if missed:
+            logger.warning("hyperscan misses %s on probe texts, using re only", sorted(missed))
+            self.db = None
+
+    def _self_check(self, patterns: dict) -> set:
+        """Names whose re pattern matches a probe the scan does not report."""
+        missed = set()
+        for probe in _SCAN_PROBES:
+            hits = self.scan(probe)
+            for name, rx in patterns.items():
+                # question patterns are run on lower-cased text by their callers
+                if name not in hits and (rx.search(probe) or rx.search(probe.lower())):
+                    missed.add(name)
+        return missed
+
+    def scan(self, content: str):
+        if self.db is None:
+            return None
+        found = set()
+
+        def on_match(pattern_id, start, end, flags, context):
+            found.add(self.names[pattern_id])
+            # stop early once every pattern has been seen
+            return len(found) == len(self.names)
+
+        if not content.isascii():
+            content = content.translate(self.fold)
+        try:
+            self.db.scan(content.encode("utf-8", errors="replace"), match_event_handler=on_match)
+        except hyperscan.ScanTerminated:
+            pass  # raised when on_match stopped the scan early; found is complete
+        return frozenset(found)
+
+
+def may_match(hits, name: str) -> bool:
+    """True unless a PageScanner result rules the pattern out."""
+    return hits is None or name in hits
+
 
 # ---------------- parse simple questions heuristics ----------------
 
-def parse_question_text(page_text: str, pre_text: str = None) -> dict:
+def parse_question_text(page_text: str, pre_text: str = None, hits=None,
+                        default: Optional[str] = "return_text") -> dict:
     """
     Heuristic parsing for common instructions.
     Returns dict with keys: action, column, cutoff, page
+    `hits` is an optional PageScanner result used to skip patterns that cannot match.
+    `default` is the action when nothing matched; pass None to detect that case.
     """
-    content = (pre_text or "") + "\n" + (page_text or "")
     out = {"action": None, "column": None, "cutoff": None, "page": None}
+    if hits is not None and hits.isdisjoint(QUESTION_PATTERNS):
+        out["action"] = default
+        return out
 
+    content = (pre_text or "") + "\n" + (page_text or "")
     txt = content.lower()
 
     # common: "count the rows" / "how many rows"
-    if re.search(r"\b(count|how many)\b.*\b(rows|entries|lines)\b", txt):
+    if may_match(hits, "count") and _COUNT_RE.search(txt):
         out["action"] = "count"
         return out
 
     # sum / mean / max / min
-    m = re.search(r"(sum|total|mean|average|max|min|median)\s+of\s+([A-Za-z0-9_ \-]+)", txt)
+    m = _AGG_RE.search(txt) if may_match(hits, "agg") else None
     if m:
         verb = m.group(1)
         col = m.group(2).strip().replace(" ", "_")
@@ -49,38 +217,97 @@ def parse_question_text(page_text: str, pre_text: str = None) -> dict:
         return out
 
     # filter like 'greater than 100' or '> 100' for cutoff
-    m2 = re.search(r"(?:greater than|>|\bmore than\b)\s*([0-9,\.]+)", txt)
+    m2 = _CUTOFF_RE.search(txt) if may_match(hits, "cutoff") else None
     if m2:
         out["cutoff"] = float(m2.group(1).replace(",", ""))
 
     # chart
-    if re.search(r"\b(chart|plot|graph)\b", txt):
+    if may_match(hits, "chart") and _CHART_RE.search(txt):
         out["action"] = "chart"
         return out
 
     # pdf page
-    m3 = re.search(r"page\s+(\d+)", txt)
+    m3 = _PAGE_RE.search(txt) if may_match(hits, "page") else None
     if m3:
         out["page"] = int(m3.group(1))
 
-    # fallback: return_text
-    out["action"] = out["action"] or "return_text"
+    # fallback: return_text unless the caller asked otherwise
+    out["action"] = out["action"] or default
     return out
 
 
 # ---------------- CSV / Excel / PDF computation helpers ----------------
 
+_NUMERIC_ACTIONS = ("sum", "mean", "max", "min", "count", "median")
+
+# returned by the Arrow fast path when pandas has to handle the request
+_NO_FAST_PATH = object()
+
+
 def compute_answer_from_csv_bytes(b: bytes, spec: dict):
+    if pa is not None and spec.get("action") in _NUMERIC_ACTIONS:
+        try:
+            answer = _compute_numeric_from_csv_arrow(b, spec)
+            if answer is not _NO_FAST_PATH:
+                return answer
+        except Exception as e:
+            logger.info("Arrow CSV path failed, using pandas: %s", e)
+
     buf = BytesIO(b)
     try:
         df = pd.read_csv(buf)
     except Exception:
         # try excel-ish reading
         buf.seek(0)
-        df = pd.read_csv(buf, engine="python", error_bad_lines=False)
+        df = pd.read_csv(buf, engine="python", on_bad_lines="skip")
     return _compute_from_dataframe(df, spec)
 
 
+def _compute_numeric_from_csv_arrow(b: bytes, spec: dict):
+    """
+    Numeric actions straight from an Arrow table: only the target column is
+    converted, with the same column resolution and results as the pandas path.
+    Anything Arrow can't type cleanly is left to pandas' coercing parser.
+    """
+    table = pacsv.read_csv(pa.BufferReader(b))
+    if table.num_rows == 0:
+        return _NO_FAST_PATH
+
+    # pandas reads an all-empty column as float64, Arrow as null; both must
+    # count it as numeric, or the single-numeric-column pick can differ
+    numeric_cols = [
+        f.name for f in table.schema
+        if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)
+        or pa.types.is_decimal(f.type) or pa.types.is_null(f.type)
+    ]
+    colname = _resolve_column(table.column_names, spec.get("column"), numeric_cols)
+    if not colname or colname not in numeric_cols:
+        return _NO_FAST_PATH
+
+    arr = pc.drop_null(pc.cast(table.column(colname), pa.float64()))
+    arr = pc.filter(arr, pc.invert(pc.is_nan(arr)))
+    cutoff = spec.get("cutoff")
+    if cutoff is not None:
+        arr = pc.filter(arr, pc.greater(arr, float(cutoff)))
+
+    action = spec.get("action")
+    if len(arr) == 0:
+        return 0 if action == "sum" else None
+    if action == "sum":
+        return float(pc.sum(arr).as_py())
+    if action == "mean":
+        return float(pc.mean(arr).as_py())
+    if action == "max":
+        return float(pc.max(arr).as_py())
+    if action == "min":
+        return float(pc.min(arr).as_py())
+    if action == "count":
+        return len(arr)
+    if action == "median":
+        return float(pc.quantile(arr, q=0.5)[0].as_py())
+    return _NO_FAST_PATH
+
+
 def compute_answer_from_excel_bytes(b: bytes, spec: dict):
     buf = BytesIO(b)
     try:
@@ -93,76 +320,142 @@ def compute_answer_from_excel_bytes(b: bytes, spec: dict):
     return _compute_from_dataframe(df, spec)
 
 
-def compute_answer_from_pdf_bytes(b: bytes, spec: dict):
-    """
-    Extract text from PDF. If the spec asks for numeric aggregation and a table is present,
-    we attempt to parse tables with pandas read_html (rare) or simple regex numbers.
-    Otherwise return extracted text.
-    """
-    try:
-        with pdfplumber.open(BytesIO(b)) as pdf:
-            page_no = spec.get("page", 1)
-            page_no = max(1, page_no)
-            if page_no <= len(pdf.pages):
-                page = pdf.pages[page_no - 1]
-                text = page.extract_text() or ""
-            else:
-                text = "\n".join(p.extract_text() or "" for p in pdf.pages)
-    except Exception:
-        text = b.decode("utf-8", errors="ignore")[:2000]
-
-    # if spec wants sum/mean/... try simple numeric extraction on page text
-    action = spec.get("action")
-    if action in ("sum", "mean", "max", "min", "count", "median"):
-        nums = [float(x.replace(",", "")) for x in re.findall(r"[-+]?\d{1,3}(?:[,]\d{3})*(?:\.\d+)?|\d+\.\d+", text)]
-        if not nums:
-            return text.strip()[:1000]
+# text answers never use more than this many leading characters of a PDF
+_PDF_TEXT_LIMIT = 2000
+
+
+def _select_pages(page_count: int, page_no=None) -> range:
+    """Indices to read: the requested page if it exists, else every page."""
+    if page_no is not None:
+        page_no = max(1, page_no)
+        if page_no <= page_count:
+            return range(page_no - 1, page_no)
+    return range(page_count)
+
+
+def _iter_pdf_page_texts(b: bytes, page_no=None):
+    """Yield page texts one at a time: the requested page, or every page in order."""
+    done = 0  # pages already yielded, so a fallback resumes instead of repeating them
+    if pymupdf is not None:
+        try:
+            with pymupdf.open(stream=b, filetype="pdf") as doc:
+                for i in _select_pages(doc.page_count, page_no):
+                    text = doc.load_page(i).get_text("text")
+                    yield text
+                    done += 1
+            return
+        except Exception as e:
+            logger.info("PyMuPDF failed after %d pages, continuing with pdfplumber: %s", done, e)
+
+    import pdfplumber  # deferred: pdfminer is slow to import and only PDFs need it
+
+    with pdfplumber.open(BytesIO(b)) as pdf:
+        for i in _select_pages(len(pdf.pages), page_no)[done:]:
+            yield pdf.pages[i].extract_text() or ""
+
+
+class _NumberAggregator:
+    """Running sum/count/min/max of the numbers in streamed text; per-page arrays are kept only for median."""
+
+    def __init__(self, keep_values: bool = False):
+        self.total = 0.0
+        self.count = 0
+        self.max = None
+        self.min = None
+        self.values = [] if keep_values else None
+
+    def add_text(self, text: str) -> None:
+        matches = _NUM_RE.findall(text)
+        if not matches:
+            return
+        # commas are stripped after matching (the pattern relies on them as
+        # thousands separators), then numpy parses every match in one call
+        arr = np.array(" ".join(matches).replace(",", "").split(), dtype=np.float64)
+        self.total += float(arr.sum())
+        self.count += arr.size
+        page_max, page_min = float(arr.max()), float(arr.min())
+        if self.max is None or page_max > self.max:
+            self.max = page_max
+        if self.min is None or page_min < self.min:
+            self.min = page_min
+        if self.values is not None:
+            self.values.append(arr)
+
+    def result(self, action: str):
         if action == "sum":
-            return sum(nums)
+            return self.total
         if action == "mean":
-            return sum(nums) / len(nums)
+            return self.total / self.count
         if action == "max":
-            return max(nums)
+            return self.max
         if action == "min":
-            return min(nums)
+            return self.min
         if action == "count":
-            return len(nums)
+            return self.count
         if action == "median":
-            nums.sort()
-            n = len(nums)
-            mid = n // 2
-            return (nums[mid] if n % 2 else (nums[mid - 1] + nums[mid]) / 2)
-    return text.strip()[:2000]
+            return float(np.median(np.concatenate(self.values)))
+        return None
 
 
-def _compute_from_dataframe(df: pd.DataFrame, spec: dict):
+def compute_answer_from_pdf_bytes(b: bytes, spec: dict):
     """
-    Unified operations for DataFrame:
-    - actions: sum/mean/max/min/count/chart/return_text
-    - columns: accept common variants (case-insensitive)
+    Extract text from PDF page by page. If the spec asks for numeric aggregation,
+    numbers are aggregated as each page is extracted, so the full document text is
+    never held; otherwise extraction stops once enough leading text is collected.
     """
-    if df is None or df.empty:
-        return "empty"
-
     action = spec.get("action")
-    col = spec.get("column")
-    cutoff = spec.get("cutoff")
+    agg = None
+    if action in ("sum", "mean", "max", "min", "count", "median"):
+        agg = _NumberAggregator(keep_values=action == "median")
 
+    head = []
+    head_len = 0
+    try:
+        for text in _iter_pdf_page_texts(b, spec.get("page")):
+            if head_len < _PDF_TEXT_LIMIT:
+                head.append(text)
+                head_len += len(text) + 1
+            if agg is not None:
+                agg.add_text(text)
+            elif head_len >= _PDF_TEXT_LIMIT:
+                break
+    except Exception as e:
+        if head:
+            if agg is not None:
+                # totals over only part of the document would be silently wrong
+                logger.warning("PDF extraction failed midway, answering with text: %s", e)
+                agg = None
+        else:
+            # not a readable PDF: fall back to the raw bytes
+            text = b.decode("utf-8", errors="ignore")[:2000]
+            head = [text]
+            if agg is not None:
+                agg.add_text(text)
+
+    text = "\n".join(head)
+    if agg is not None:
+        if not agg.count:
+            return text.strip()[:1000]
+        return agg.result(action)
+    return text.strip()[:2000]
+
+
+def _resolve_column(columns, col, numeric_cols):
+    """Pick the column to aggregate from a table's column names, or None."""
     # Normalize and allow some fuzzy column matches for booknow/cinepos
     colname = None
     if col:
         # try direct match first
-        if col in df.columns:
+        if col in columns:
             colname = col
         else:
             # case-insensitive match
-            for c in df.columns:
+            for c in columns:
                 if c.lower() == col.lower() or c.lower().replace(" ", "_") == col.lower().replace(" ", "_"):
                     colname = c
                     break
     else:
         # if only one numeric column, pick it for simple ops
-        numeric_cols = df.select_dtypes(include="number").columns.tolist()
         if len(numeric_cols) == 1:
             colname = numeric_cols[0]
 
@@ -172,31 +465,82 @@ def _compute_from_dataframe(df: pd.DataFrame, spec: dict):
     # CINEPOS: ['cine_theater_id','show_datetime','booking_datetime','tickets_sold']
     # Accept both 'tickets_booked' and 'tickets_sold' as numeric column candidates
     for candidate in ("tickets_booked", "tickets_sold", "tickets"):
-        if candidate in df.columns and not colname:
+        if candidate in columns and not colname:
             colname = candidate
             break
+    return colname
+
+
+# below this many rows the numpy reductions win over the JIT kernel's thread startup
+_JIT_MIN_ROWS = 100_000
+
+if njit is not None:
+    # no fastmath: it would let the compiler assume v == v and drop the NaN check
+    @njit(parallel=True, cache=True)
+    def _masked_stats(vals, cutoff, use_cutoff):
+        """Sum, count, max and min of the non-NaN values (above cutoff) in one parallel pass."""
+        total = 0.0
+        n = 0
+        hi = -np.inf
+        lo = np.inf
+        for i in prange(vals.shape[0]):
+            v = vals[i]
+            if v == v and (not use_cutoff or v > cutoff):
+                total += v
+                n += 1
+                hi = max(hi, v)
+                lo = min(lo, v)
+        return total, n, hi, lo
+else:
+    _masked_stats = None
+
+
+def _compute_from_dataframe(df: pd.DataFrame, spec: dict):
+    """
+    Unified operations for DataFrame:
+    - actions: sum/mean/max/min/count/chart/return_text
+    - columns: accept common variants (case-insensitive)
+    """
+    if df is None or df.empty:
+        return "empty"
+
+    action = spec.get("action")
+    col = spec.get("column")
+    cutoff = spec.get("cutoff")
+
+    numeric_cols = [] if col else df.select_dtypes(include="number").columns.tolist()
+    colname = _resolve_column(df.columns, col, numeric_cols)
 
     try:
-        if action in ("sum", "mean", "max", "min", "count", "median"):
+        if action in _NUMERIC_ACTIONS:
             if not colname:
                 return "no-column"
-            series = pd.to_numeric(df[colname], errors="coerce").dropna()
+            # one float64 buffer plus a boolean mask; the reductions below
+            # apply the mask themselves instead of materializing filtered copies
+            vals = pd.to_numeric(df[colname], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            if _masked_stats is not None and action != "median" and vals.size >= _JIT_MIN_ROWS:
+                total, n, hi, lo = _masked_stats(vals, 0.0 if cutoff is None else float(cutoff), cutoff is not None)
+                if n == 0:
+                    return 0 if action == "sum" else None
+                return {"sum": total, "mean": total / n, "max": hi, "min": lo, "count": n}[action]
+            mask = ~np.isnan(vals)
             if cutoff is not None:
-                series = series[series > float(cutoff)]
-            if series.empty:
+                mask &= vals > float(cutoff)
+            n = int(np.count_nonzero(mask))
+            if n == 0:
                 return 0 if action == "sum" else None
             if action == "sum":
-                return float(series.sum())
+                return float(np.add.reduce(vals, where=mask, initial=0.0))
             if action == "mean":
-                return float(series.mean())
+                return float(np.add.reduce(vals, where=mask, initial=0.0)) / n
             if action == "max":
-                return float(series.max())
+                return float(np.maximum.reduce(vals, where=mask, initial=-np.inf))
             if action == "min":
-                return float(series.min())
+                return float(np.minimum.reduce(vals, where=mask, initial=np.inf))
             if action == "count":
-                return int(series.count())
+                return n
             if action == "median":
-                return float(series.median())
+                return float(np.median(vals[mask]))
         elif action == "chart":
             # produce chart data URI of first two columns if numeric available
             return df_to_chart_data_uri(df)
@@ -210,29 +554,66 @@ def _compute_from_dataframe(df: pd.DataFrame, spec: dict):
 
 # ---------------- helpers: file -> data URI and small utils ----------------
 
+def _b64_str(b: bytes) -> str:
+    if pybase64 is not None:
+        # one SIMD pass straight to str, no intermediate bytes copy to decode
+        return pybase64.b64encode_as_string(b)
+    return base64.b64encode(b).decode("ascii")
+
+
 def file_bytes_to_data_uri(b: bytes, ext: str) -> str:
-    b64 = base64.b64encode(b).decode("ascii")
-    return f"data:application/{ext};base64,{b64}"
+    return f"data:application/{ext};base64,{_b64_str(b)}"
+
+
+# line chart canvas, the size of the old 6x3in matplotlib figure at 100 dpi
+_CHART_W, _CHART_H = 600, 300
+_CHART_MARGIN, _CHART_TITLE_H = 10, 20
+
+
+def _line_chart_png(values: np.ndarray, title: str) -> bytes:
+    """Rasterize values (in index order) as a polyline PNG with Pillow."""
+    img = Image.new("RGB", (_CHART_W, _CHART_H), "white")
+    draw = ImageDraw.Draw(img)
+    draw.text((_CHART_MARGIN, 4), title, fill="black")
+    left, top = _CHART_MARGIN, _CHART_TITLE_H
+    right, bottom = _CHART_W - _CHART_MARGIN - 1, _CHART_H - _CHART_MARGIN - 1
+    draw.rectangle((left, top, right, bottom), outline=(200, 200, 200))
+
+    values = values[np.isfinite(values)]
+    if values.size:
+        # more points than pixel columns cannot show anyway
+        width = right - left + 1
+        if values.size > width:
+            values = values[np.linspace(0, values.size - 1, width).astype(np.intp)]
+        lo, hi = values.min(), values.max()
+        if hi > lo:
+            ys = np.interp(values, (lo, hi), (bottom, top))
+        else:
+            ys = np.full(values.size, (top + bottom) / 2.0)
+        xs = np.linspace(left, right, values.size) if values.size > 1 else np.array([(left + right) / 2.0])
+        points = list(zip(xs.tolist(), ys.tolist()))
+        if len(points) > 1:
+            draw.line(points, fill=(31, 119, 180), width=2)
+        else:
+            x, y = points[0]
+            draw.ellipse((x - 2, y - 2, x + 2, y + 2), fill=(31, 119, 180))
+
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
 
 
 def df_to_chart_data_uri(df):
     # Simple chart: first numeric column vs index
     try:
-        s = None
         numcols = df.select_dtypes(include="number").columns.tolist()
         if numcols:
-            s = df[numcols[0]].dropna()
-            plt.figure(figsize=(6, 3))
-            plt.plot(s.index.values, s.values)
-            plt.title(str(numcols[0]))
-            plt.tight_layout()
-            buf = BytesIO()
-            plt.savefig(buf, format="png", bbox_inches="tight")
-            buf.seek(0)
-            data = base64.b64encode(buf.read()).decode("ascii")
-            plt.close()
+            values = df[numcols[0]].dropna().to_numpy(dtype=np.float64)
+            data = _b64_str(_line_chart_png(values, str(numcols[0])))
             return f"data:image/png;base64,{data}"
         else:
+            import matplotlib.pyplot as plt  # deferred: only the table fallback needs matplotlib
+
             # fallback: table snapshot as text image
             txt = df.head(10).to_string()
             plt.figure(figsize=(6, 3))